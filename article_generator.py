@@ -2,13 +2,139 @@
 Article generation using AI
 """
 import os
-import json
+import re
+import time
+import asyncio
+import logging
 import anthropic
+import serialization
+from response_cache import ResponseCache
 from models import (
     ArticleOutline, GeneratedArticle, SEOMetadata, 
     KeywordAnalysis, InternalLink, ExternalReference
 )
-from typing import List
+from typing import Callable, Dict, Generator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# HTML tags, replaced by spaces before counting words and keywords
+_TAG_RE = re.compile(r'<[^>]+>')
+
+MODEL = "claude-sonnet-4-20250514"
+ARTICLE_MAX_TOKENS = 4000
+
+# Articles per row-marshaled call; larger batches save round-trips but
+# push latency and the risk of a truncated response up
+BATCH_SIZE = 4
+# Rough output tokens per target word (HTML markup + JSON escaping)
+TOKENS_PER_WORD = 2
+
+# (topic, outline, target_word_count, questions)
+ArticleSpec = Tuple[str, ArticleOutline, int, List[str]]
+
+# 429s retried by the async path on top of the SDK's own retries
+RATE_LIMIT_RETRIES = 5
+
+# Seconds between status checks while a message batch is processing
+BATCH_POLL_INTERVAL = 30
+
+# Instructions shared by every article request. Sent as the first content
+# block with a cache breakpoint so repeat calls read it from the prompt cache.
+SYSTEM_BLOCK = """You write complete, SEO-optimized articles from an outline.
+
+REQUIREMENTS:
+- Write in a natural, engaging style (not robotic)
+- Include the primary keyword in the first paragraph
+- Use proper HTML heading hierarchy (h1, h2, h3)
+- Each section should be substantial and informative
+- Meet the target word count
+- Include a FAQ section at the end answering the listed questions
+
+OUTPUT FORMAT (must be valid JSON):
+{
+    "article_html": "Full HTML article with proper heading tags",
+    "title_tag": "SEO title under 60 chars",
+    "meta_description": "Meta description under 160 chars",
+    "primary_keyword": "main keyword",
+    "secondary_keywords": ["keyword1", "keyword2", "keyword3"],
+    "internal_links": [
+        {"anchor_text": "text", "target_page": "suggested-page-topic", "context": "where it fits"},
+        ...3-5 suggestions
+    ],
+    "external_references": [
+        {"source_name": "Source", "url": "https://example.com", "context": "what to cite"},
+        ...2-4 authoritative sources
+    ],
+    "faq_html": "HTML FAQ section"
+}
+
+Respond with JSON only (no markdown code blocks)."""
+
+# Per-article prompt; only the slots are filled in on each call
+_ARTICLE_PROMPT = """Generate a complete, SEO-optimized article about "{topic}".
+
+OUTLINE:
+# {h1}
+
+{sections}
+
+DETAILS:
+- Target word count: {target_word_count} words
+- Primary keyword: "{topic}"
+- FAQ questions: {questions}
+
+Generate the article now as JSON only (no markdown code blocks):""".format
+
+_BATCH_ITEM_PROMPT = """ARTICLE id={index}
+Topic / primary keyword: "{topic}"
+Target word count: {target_word_count} words
+FAQ questions: {questions}
+OUTLINE:
+# {h1}
+
+{sections}""".format
+
+_BATCH_PROMPT = """Generate {count} articles, one for each item below.
+
+{items}
+
+Write each article in the OUTPUT FORMAT above, add its "id", and return them all as:
+{{"results": [{{"id": 0, "article_html": "...", ...}}, ...one entry per article]}}
+
+Generate the articles now as JSON only (no markdown code blocks):""".format
+
+
+def _drain(stream: Generator, on_item: Callable):
+    """Feed every item of a generator to a callback and return its return value"""
+    while True:
+        try:
+            on_item(next(stream))
+        except StopIteration as done:
+            return done.value
+
+
+class RateLimitBackoff:
+    """
+    Backoff shared by concurrent async calls (AIMD on the request rate).
+    Every 429 doubles the delay callers wait before sending; every
+    success shrinks it by a fixed step.
+    """
+    
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0, step: float = 0.5):
+        self.initial = initial
+        self.maximum = maximum
+        self.step = step
+        self.delay = 0.0
+    
+    async def wait(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+    
+    def on_success(self):
+        self.delay = max(0.0, self.delay - self.step)
+    
+    def on_rate_limit(self):
+        self.delay = min(self.maximum, max(self.initial, self.delay * 2))
 
 
 class ArticleGenerator:
@@ -16,118 +142,388 @@ class ArticleGenerator:
     
     def __init__(self):
         # API key should be set as environment variable
-import google.generativeai as genai
-genai.configure(api_key=...)
-self.model = genai.GenerativeModel('gemini-pro')
+        self.client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        self._async_client = None
+        self.backoff = RateLimitBackoff()
+        # Optional on-disk response cache, enabled by LLM_CACHE_DIR
+        self.cache = ResponseCache.from_env()
+        # Running token totals, including prompt cache hits
+        self.usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0
+        }
+    
+    @property
+    def async_client(self) -> anthropic.AsyncAnthropic:
+        """Async client, over HTTP/2 when h2 is installed. Created on first use."""
+        if self._async_client is None:
+            try:
+                http_client = anthropic.DefaultAsyncHttpxClient(http2=True)
+            except ImportError:
+                http_client = None
+            self._async_client = anthropic.AsyncAnthropic(
+                api_key=os.environ.get("ANTHROPIC_API_KEY"),
+                http_client=http_client
+            )
+        return self._async_client
+    
     def generate_article(
         self, 
         topic: str, 
         outline: ArticleOutline,
         target_word_count: int,
-        questions: List[str]
+        questions: List[str],
+        on_text: Optional[Callable[[str], None]] = None
     ) -> GeneratedArticle:
-        """Generate complete article with SEO optimization"""
+        """
+        Generate complete article with SEO optimization.
+        If on_text is given, response text is streamed to it as it arrives.
+        """
         
         # Create detailed prompt for article generation
         prompt = self._create_article_prompt(topic, outline, target_word_count, questions)
+        params = self._request_params(prompt)
         
-        # Call Claude API
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+        # Call Claude API (or the response cache)
+        if on_text is None:
+            data, cache_key = self._call(params)
+        else:
+            data, cache_key = _drain(self._stream(params), on_text)
         
-        # Parse response
-        response_text = message.content[0].text
-        article_data = self._parse_article_response(response_text, topic, outline, target_word_count)
+        return self._article_from(data, cache_key, topic, outline, target_word_count)
+    
+    def generate_article_stream(
+        self, 
+        topic: str, 
+        outline: ArticleOutline,
+        target_word_count: int,
+        questions: List[str]
+    ) -> Generator[str, None, GeneratedArticle]:
+        """
+        Streaming variant of generate_article. Yields response text as it
+        arrives; the parsed article is the generator's return value
+        (article = yield from generator.generate_article_stream(...)).
+        """
+        prompt = self._create_article_prompt(topic, outline, target_word_count, questions)
+        
+        data, cache_key = yield from self._stream(self._request_params(prompt))
         
-        return article_data
+        return self._article_from(data, cache_key, topic, outline, target_word_count)
     
-    def _create_article_prompt(
+    async def agenerate_article(
         self, 
         topic: str, 
         outline: ArticleOutline,
         target_word_count: int,
         questions: List[str]
-    ) -> str:
-        """Create comprehensive prompt for article generation"""
+    ) -> GeneratedArticle:
+        """Async variant of generate_article, backing off on rate limits"""
+        prompt = self._create_article_prompt(topic, outline, target_word_count, questions)
+        
+        data, cache_key = await self._acall(self._request_params(prompt))
+        
+        return self._article_from(data, cache_key, topic, outline, target_word_count)
+    
+    def generate_articles_batch(self, requests: List[ArticleSpec]) -> List[GeneratedArticle]:
+        """
+        Generate several articles, packing up to BATCH_SIZE of them into
+        a single API call. Results are returned in request order.
+        """
+        articles: List[GeneratedArticle] = [None] * len(requests)
+        batchable = []
+        
+        for index, spec in enumerate(requests):
+            # Articles too long to share the output budget go on their own
+            if spec[2] * TOKENS_PER_WORD > ARTICLE_MAX_TOKENS:
+                articles[index] = self.generate_article(*spec)
+            else:
+                batchable.append(index)
+        
+        for start in range(0, len(batchable), BATCH_SIZE):
+            chunk = batchable[start:start + BATCH_SIZE]
+            if len(chunk) == 1:
+                articles[chunk[0]] = self.generate_article(*requests[chunk[0]])
+                continue
+            
+            specs = {index: requests[index] for index in chunk}
+            for index, article in self._generate_chunk(specs).items():
+                articles[index] = article
+        
+        return articles
+    
+    def submit_batch(
+        self, 
+        requests: List[ArticleSpec],
+        poll_interval: float = BATCH_POLL_INTERVAL
+    ) -> List[Union[GeneratedArticle, Exception]]:
+        """
+        Generate articles through the Message Batches API (half price,
+        asynchronous). Blocks until the batch has ended. Results are in
+        request order; a request that did not succeed yields an exception.
+        """
+        results: List[Union[GeneratedArticle, Exception]] = [
+            RuntimeError("No result returned for batch request")
+        ] * len(requests)
+        cache_keys = {}
+        batch_requests = []
+        
+        for index, spec in enumerate(requests):
+            params = self._request_params(self._create_article_prompt(*spec))
+            if self.cache:
+                cache_keys[index] = self.cache.key(params)
+                data = self.cache.get(cache_keys[index])
+                if data is not None:
+                    results[index] = self._build_article(data, spec[1])
+                    continue
+            batch_requests.append({"custom_id": str(index), "params": params})
+        
+        if not batch_requests:
+            return results
         
-        sections_str = "\n".join([
-            f"## {section['h2']}\n" + "\n".join([f"### {h3}" for h3 in section['h3']])
-            for section in outline.sections
+        batch = self.client.messages.batches.create(requests=batch_requests)
+        logger.info(f"Submitted message batch {batch.id} with {len(batch_requests)} requests")
+        
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = self.client.messages.batches.retrieve(batch.id)
+            logger.info(f"Batch {batch.id}: {batch.processing_status}")
+        
+        for entry in self.client.messages.batches.results(batch.id):
+            index = int(entry.custom_id)
+            if entry.result.type != "succeeded":
+                results[index] = RuntimeError(f"Batch request {entry.result.type}")
+                continue
+            
+            message = entry.result.message
+            self._record_usage(message)
+            topic, outline, target_word_count, _ = requests[index]
+            try:
+                results[index] = self._parse_article_response(
+                    message.content[0].text, topic, outline, target_word_count,
+                    cache_key=cache_keys.get(index)
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                # A malformed body fails only its own request, not the paid-for batch
+                results[index] = e
+        
+        return results
+    
+    def _generate_chunk(self, specs: Dict[int, ArticleSpec]) -> Dict[int, GeneratedArticle]:
+        """Generate one row-marshaled batch, falling back to single calls for missing items"""
+        prompt = self._create_batch_prompt(specs)
+        
+        data, cache_key = self._call(self._request_params(prompt, ARTICLE_MAX_TOKENS * len(specs)))
+        try:
+            items = list(data['results'])
+        except (KeyError, TypeError):
+            items = []
+        
+        # Models sometimes echo ids as strings; an unusable id counts as missing
+        results = {}
+        for item in items:
+            try:
+                results[int(item['id'])] = item
+            except (KeyError, TypeError, ValueError):
+                continue
+        
+        articles = {}
+        complete = True
+        for index, (topic, outline, target_word_count, questions) in specs.items():
+            try:
+                articles[index] = self._build_article(results[index], outline)
+            except (KeyError, TypeError, ValueError):
+                # Missing or malformed entry: regenerate this article on its own
+                complete = False
+                articles[index] = self.generate_article(topic, outline, target_word_count, questions)
+        
+        # Only a response that produced every article is worth replaying
+        if complete and cache_key:
+            self.cache.put(cache_key, data)
+        
+        return articles
+    
+    def _create_batch_prompt(self, specs: Dict[int, ArticleSpec]) -> str:
+        """Create a single prompt asking for several articles tagged by id"""
+        
+        items_str = "\n\n".join([
+            _BATCH_ITEM_PROMPT(
+                index=index,
+                topic=topic,
+                target_word_count=target_word_count,
+                questions=', '.join(questions[:3]),
+                h1=outline.h1,
+                sections=outline.sections_markdown
+            )
+            for index, (topic, outline, target_word_count, questions) in specs.items()
         ])
         
-        prompt = f"""Generate a complete, SEO-optimized article about "{topic}".
-
-OUTLINE:
-# {outline.h1}
-
-{sections_str}
-
-REQUIREMENTS:
-- Target word count: {target_word_count} words
-- Write in a natural, engaging style (not robotic)
-- Include primary keyword "{topic}" in the first paragraph
-- Use proper HTML heading hierarchy (h1, h2, h3)
-- Each section should be substantial and informative
-- Include a FAQ section at the end answering: {', '.join(questions[:3])}
-
-OUTPUT FORMAT (must be valid JSON):
-{{
-    "article_html": "Full HTML article with proper heading tags",
-    "title_tag": "SEO title under 60 chars",
-    "meta_description": "Meta description under 160 chars",
-    "primary_keyword": "main keyword",
-    "secondary_keywords": ["keyword1", "keyword2", "keyword3"],
-    "internal_links": [
-        {{"anchor_text": "text", "target_page": "suggested-page-topic", "context": "where it fits"}},
-        ...3-5 suggestions
-    ],
-    "external_references": [
-        {{"source_name": "Source", "url": "https://example.com", "context": "what to cite"}},
-        ...2-4 authoritative sources
-    ],
-    "faq_html": "HTML FAQ section"
-}}
-
-Generate the article now as JSON only (no markdown code blocks):"""
+        prompt = _BATCH_PROMPT(count=len(specs), items=items_str)
         
         return prompt
     
+    def _create_article_prompt(
+        self, 
+        topic: str, 
+        outline: ArticleOutline,
+        target_word_count: int,
+        questions: List[str]
+    ) -> str:
+        """Create the per-article part of the prompt (SYSTEM_BLOCK holds the rest)"""
+        
+        prompt = _ARTICLE_PROMPT(
+            topic=topic,
+            h1=outline.h1,
+            sections=outline.sections_markdown,
+            target_word_count=target_word_count,
+            questions=', '.join(questions[:3])
+        )
+        
+        return prompt
+    
+    def _request_params(self, prompt: str, max_tokens: int = ARTICLE_MAX_TOKENS) -> dict:
+        """Messages API parameters for a prompt"""
+        return {
+            "model": MODEL,
+            "max_tokens": max_tokens,
+            "messages": self._build_messages(prompt)
+        }
+    
+    def _call(self, params: dict) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        Send a request, or serve it from the response cache. Returns the
+        decoded JSON body (None if the response was not valid JSON) and,
+        for a fresh response, the key to cache it under once it has been
+        used successfully (None for cache hits or when caching is off).
+        """
+        cache_key = self.cache.key(params) if self.cache else None
+        if cache_key:
+            data = self.cache.get(cache_key)
+            if data is not None:
+                return data, None
+        
+        message = self.client.messages.create(**params)
+        self._record_usage(message)
+        return self._decode_response(message.content[0].text), cache_key
+    
+    def _stream(self, params: dict) -> Generator[str, None, Tuple[Optional[dict], Optional[str]]]:
+        """
+        Streaming variant of _call: yields response text as it arrives and
+        returns what _call returns. Cache hits yield nothing.
+        """
+        cache_key = self.cache.key(params) if self.cache else None
+        if cache_key:
+            data = self.cache.get(cache_key)
+            if data is not None:
+                return data, None
+        
+        with self.client.messages.stream(**params) as stream:
+            yield from stream.text_stream
+            message = stream.get_final_message()
+        
+        self._record_usage(message)
+        return self._decode_response(message.content[0].text), cache_key
+    
+    async def _acall(self, params: dict) -> Tuple[Optional[dict], Optional[str]]:
+        """Async variant of _call, backing off on rate limits"""
+        cache_key = self.cache.key(params) if self.cache else None
+        if cache_key:
+            data = self.cache.get(cache_key)
+            if data is not None:
+                return data, None
+        
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.backoff.wait()
+            try:
+                message = await self.async_client.messages.create(**params)
+            except anthropic.RateLimitError:
+                self.backoff.on_rate_limit()
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+            else:
+                self.backoff.on_success()
+                break
+        
+        self._record_usage(message)
+        return self._decode_response(message.content[0].text), cache_key
+    
+    def _build_messages(self, prompt: str) -> List[dict]:
+        """Prefix the prompt with the cached instruction block"""
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": SYSTEM_BLOCK, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": prompt}
+                ]
+            }
+        ]
+    
+    def _record_usage(self, message):
+        """Add a response's token usage to the running totals"""
+        for key in self.usage:
+            self.usage[key] += getattr(message.usage, key, None) or 0
+    
     def _parse_article_response(
         self, 
         response: str, 
         topic: str,
         outline: ArticleOutline,
-        target_word_count: int
+        target_word_count: int,
+        cache_key: Optional[str] = None
     ) -> GeneratedArticle:
         """Parse Claude's response into structured article"""
         
-        # Clean response and parse JSON
-        response = response.strip()
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        response = response.strip()
+        data = self._decode_response(response)
+        return self._article_from(data, cache_key, topic, outline, target_word_count)
+    
+    def _article_from(
+        self, 
+        data: Optional[dict], 
+        cache_key: Optional[str],
+        topic: str,
+        outline: ArticleOutline,
+        target_word_count: int
+    ) -> GeneratedArticle:
+        """
+        Build the article from a decoded response, or the fallback if it was
+        not JSON. The response is cached only once it has built successfully,
+        so an unusable response is requested again rather than replayed.
+        """
+        if data is None:
+            # Fallback if JSON parsing fails
+            fallback = self._create_fallback_article(topic, outline, target_word_count)
+            return self._build_article(fallback, outline)
+        
+        article = self._build_article(data, outline)
+        if cache_key:
+            self.cache.put(cache_key, data)
+        return article
+    
+    def _decode_response(self, response: str) -> Optional[dict]:
+        """Parse the JSON body of a response. None if it is not JSON."""
         
+        # Clean response and parse JSON
         try:
-            data = json.loads(response)
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            data = self._create_fallback_article(topic, outline, target_word_count)
+            return serialization.loads(self._strip_code_fences(response))
+        except serialization.JSONDecodeError:
+            return None
+    
+    def _strip_code_fences(self, response: str) -> str:
+        """Remove surrounding whitespace and markdown code fences"""
+        response = response.strip().removeprefix("```json").removeprefix("```")
+        return response.removesuffix("```").strip()
+    
+    def _build_article(self, data: dict, outline: ArticleOutline) -> GeneratedArticle:
+        """Build a GeneratedArticle from parsed response data"""
         
-        # Count words in article
-        word_count = len(data['article_html'].split())
+        # Count words in the article text, ignoring markup
+        text_lower = _TAG_RE.sub(' ', data['article_html']).lower()
+        word_count = len(text_lower.split())
         
         # Calculate keyword density
-        content_lower = data['article_html'].lower()
-        primary_count = content_lower.count(data['primary_keyword'].lower())
+        primary_count = text_lower.count(data['primary_keyword'].lower())
         keyword_density = (primary_count / word_count * 100) if word_count > 0 else 0
         
         return GeneratedArticle(
@@ -0,0 +1,44 @@
+"""
+Shared pytest fixtures
+"""
+import sqlite3
+import pytest
+from serp_analyzer import SERPAnalyzer
+from job_manager import JobManager
+from seo_agent import SEOAgent
+
+
+@pytest.fixture(scope="session")
+def analyzer():
+    """SERPAnalyzer shared by the tests that need one"""
+    return SERPAnalyzer()
+
+
+@pytest.fixture(scope="session")
+def template_db():
+    """In-memory database with the job schema, built once per session"""
+    conn = sqlite3.connect(":memory:")
+    JobManager._init_schema(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def manager(template_db):
+    """JobManager on a fresh in-memory copy of the template database"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    template_db.backup(conn)
+    manager = JobManager.from_connection(conn)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(scope="session")
+def seo_agent(tmp_path_factory):
+    """One agent, and so one API client and connection pool, for all end-to-end tests"""
+    with pytest.MonkeyPatch.context() as mp:
+        # Always exercise the live API, never responses cached by another run
+        mp.delenv("LLM_CACHE_DIR", raising=False)
+        agent = SEOAgent(str(tmp_path_factory.mktemp("e2e") / "jobs.db"))
+    yield agent
+    agent.job_manager.close()
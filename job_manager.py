@@ -2,11 +2,83 @@
 Job management and persistence
 """
 import sqlite3
-import json
+import threading
 import uuid
-from datetime import datetime
-from typing import Optional
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
 from models import GenerationJob, JobStatus, ArticleRequest, SERPData, GeneratedArticle
+import serialization
+
+# Timestamps are stored as integer microseconds since the Unix epoch (UTC)
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+_CREATE_JOBS = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id BLOB PRIMARY KEY,
+        status TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        target_word_count INTEGER,
+        language TEXT,
+        serp_data BLOB,
+        article_data BLOB,
+        error_message TEXT,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    )
+"""
+# Bumped whenever _init_schema learns a new one-time migration
+_SCHEMA_VERSION = 2
+
+_JOB_COLUMNS = (
+    "(job_id, status, topic, target_word_count, language, serp_data, "
+    "article_data, error_message, created_at, updated_at)"
+)
+_JOB_PLACEHOLDERS = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+# Rows per multi-row INSERT; keeps the bound parameters under SQLite's
+# historical 999-variable limit
+_INSERT_BATCH_ROWS = 99
+
+
+def _to_epoch_us(value: datetime) -> int:
+    """Convert a naive UTC datetime to epoch microseconds"""
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_epoch_us(value: Union[int, str]) -> datetime:
+    """Convert stored epoch microseconds back to a naive UTC datetime"""
+    if isinstance(value, str):
+        # Tables from before the INTEGER columns hold ISO strings, or
+        # digit strings where TEXT affinity converted an integer
+        if not value.isdigit():
+            return datetime.fromisoformat(value)
+        value = int(value)
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _now_us() -> int:
+    return _to_epoch_us(datetime.utcnow())
+
+
+def _upgrade_row(row: tuple) -> tuple:
+    """Convert a row from an older jobs table to the current column types"""
+    (job_id, status, topic, word_count, language, serp_data,
+     article_data, error, created, updated) = row
+    if isinstance(job_id, str):
+        job_id = uuid.UUID(job_id).bytes
+    return (
+        job_id, status, topic, word_count, language, serp_data, article_data, error,
+        _to_epoch_us(_from_epoch_us(created)), _to_epoch_us(_from_epoch_us(updated))
+    )
+
+
+def _job_key(job_id: str) -> Optional[bytes]:
+    """Convert a job ID (hex, with or without dashes) to its 16-byte storage key"""
+    try:
+        return uuid.UUID(job_id).bytes
+    except ValueError:
+        return None
 
 
 class JobManager:
@@ -14,34 +86,97 @@ class JobManager:
     
     def __init__(self, db_path: str = "jobs.db"):
         self.db_path = db_path
-        self._init_db()
+        # One connection for the manager's lifetime, shared across threads.
+        # It runs in autocommit mode; the lock serializes access to it.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._init_schema(self._conn)
     
-    def _init_db(self):
-        """Initialize SQLite database"""
-        conn = sqlite3.connect(self.db_path)
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "JobManager":
+        """
+        Manage jobs on an existing connection, e.g. an in-memory copy of a
+        prepared database. The connection is switched to autocommit mode;
+        open it with check_same_thread=False if it will be shared across threads.
+        """
+        manager = cls.__new__(cls)
+        manager.db_path = None
+        conn.isolation_level = None
+        manager._conn = conn
+        manager._lock = threading.RLock()
+        cls._init_schema(conn)
+        return manager
+    
+    @staticmethod
+    def _init_schema(conn: sqlite3.Connection):
+        """Create the jobs table and bring older databases up to date"""
         cursor = conn.cursor()
         
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        
+        cursor.execute(_CREATE_JOBS)
+        
+        # Tables created before job IDs were 16-byte UUIDs and timestamps
+        # were epoch microseconds keep their old TEXT columns, whose affinity
+        # would turn new integer timestamps into strings that sort wrongly.
+        # Rebuild those once with the current column types.
+        if cursor.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                types = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(jobs)")}
+                if types["job_id"] != "BLOB" or types["created_at"] != "INTEGER":
+                    rows = cursor.execute("SELECT * FROM jobs").fetchall()
+                    cursor.execute("DROP TABLE jobs")
+                    cursor.execute(_CREATE_JOBS)
+                    cursor.executemany(
+                        f"INSERT INTO jobs {_JOB_COLUMNS} VALUES {_JOB_PLACEHOLDERS}",
+                        [_upgrade_row(row) for row in rows]
+                    )
+                cursor.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+        
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS jobs (
-                job_id TEXT PRIMARY KEY,
-                status TEXT NOT NULL,
-                topic TEXT NOT NULL,
-                target_word_count INTEGER,
-                language TEXT,
-                serp_data TEXT,
-                article_data TEXT,
-                error_message TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
+            CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at DESC)
         """)
-        
-        conn.commit()
-        conn.close()
+    
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group the writes made inside the block into one transaction that
+        commits (and syncs) once on exit, or rolls back on error.
+        Nested blocks join the outer transaction.
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                yield
+                return
+            
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    @contextmanager
+    def _cursor(self):
+        """Cursor on the shared connection, held under the lock"""
+        with self._lock:
+            yield self._conn.cursor()
     
     def create_job(self, request: ArticleRequest) -> GenerationJob:
         """Create a new generation job"""
-        job_id = str(uuid.uuid4())
+        job_id = uuid.uuid4().hex
         now = datetime.utcnow()
         
         job = GenerationJob(
@@ -55,17 +190,39 @@ class JobManager:
         self._save_job(job)
         return job
     
-    def get_job(self, job_id: str) -> Optional[GenerationJob]:
-        """Retrieve job by ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def create_jobs(self, requests: List[ArticleRequest]) -> List[GenerationJob]:
+        """Create a generation job per request with multi-row INSERTs in one transaction"""
+        now = datetime.utcnow()
+        jobs = [
+            GenerationJob(
+                job_id=uuid.uuid4().hex,
+                status=JobStatus.PENDING,
+                request=request,
+                created_at=now,
+                updated_at=now
+            )
+            for request in requests
+        ]
         
-        cursor.execute("""
-            SELECT * FROM jobs WHERE job_id = ?
-        """, (job_id,))
+        with self.transaction(), self._cursor() as cursor:
+            for start in range(0, len(jobs), _INSERT_BATCH_ROWS):
+                batch = jobs[start:start + _INSERT_BATCH_ROWS]
+                cursor.execute(
+                    f"INSERT INTO jobs {_JOB_COLUMNS} VALUES "
+                    + ", ".join([_JOB_PLACEHOLDERS] * len(batch)),
+                    [value for job in batch for value in self._job_row(job)]
+                )
         
-        row = cursor.fetchone()
-        conn.close()
+        return jobs
+    
+    def get_job(self, job_id: str) -> Optional[GenerationJob]:
+        """Retrieve job by ID"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT * FROM jobs WHERE job_id = ?
+            """, (_job_key(job_id),))
+            
+            row = cursor.fetchone()
         
         if not row:
             return None
@@ -74,71 +231,68 @@ class JobManager:
     
     def update_job_status(self, job_id: str, status: JobStatus, error: Optional[str] = None):
         """Update job status"""
-        job = self.get_job(job_id)
-        if not job:
-            raise ValueError(f"Job {job_id} not found")
-        
-        job.status = status
-        job.updated_at = datetime.utcnow()
-        if error:
-            job.error_message = error
-        
-        self._save_job(job)
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE jobs 
+                SET status = ?, updated_at = ?, error_message = COALESCE(?, error_message)
+                WHERE job_id = ?
+            """, (status.value, _now_us(), error or None, _job_key(job_id)))
+            
+            if cursor.rowcount == 0:
+                raise ValueError(f"Job {job_id} not found")
     
     def save_serp_data(self, job_id: str, serp_data: SERPData):
         """Save SERP data to job"""
-        job = self.get_job(job_id)
-        if not job:
-            raise ValueError(f"Job {job_id} not found")
-        
-        job.serp_data = serp_data
-        job.updated_at = datetime.utcnow()
-        self._save_job(job)
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE jobs SET serp_data = ?, updated_at = ? WHERE job_id = ?
+            """, (serialization.pack(serp_data), _now_us(), _job_key(job_id)))
+            
+            if cursor.rowcount == 0:
+                raise ValueError(f"Job {job_id} not found")
     
     def save_article(self, job_id: str, article: GeneratedArticle):
         """Save generated article to job"""
-        job = self.get_job(job_id)
-        if not job:
-            raise ValueError(f"Job {job_id} not found")
-        
-        job.article = article
-        job.status = JobStatus.COMPLETED
-        job.updated_at = datetime.utcnow()
-        self._save_job(job)
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE jobs SET article_data = ?, status = ?, updated_at = ? WHERE job_id = ?
+            """, (
+                serialization.pack(article),
+                JobStatus.COMPLETED.value,
+                _now_us(),
+                _job_key(job_id)
+            ))
+            
+            if cursor.rowcount == 0:
+                raise ValueError(f"Job {job_id} not found")
     
     def _save_job(self, job: GenerationJob):
         """Persist job to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        serp_json = json.dumps(job.serp_data.dict()) if job.serp_data else None
-        article_json = json.dumps(job.article.dict()) if job.article else None
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO jobs 
-            (job_id, status, topic, target_word_count, language, serp_data, 
-             article_data, error_message, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            job.job_id,
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO jobs {_JOB_COLUMNS} VALUES {_JOB_PLACEHOLDERS}",
+                self._job_row(job)
+            )
+    
+    def _job_row(self, job: GenerationJob) -> tuple:
+        """Column values for a job, in _JOB_COLUMNS order"""
+        return (
+            _job_key(job.job_id),
             job.status.value,
             job.request.topic,
             job.request.target_word_count,
             job.request.language,
-            serp_json,
-            article_json,
+            serialization.pack(job.serp_data) if job.serp_data else None,
+            serialization.pack(job.article) if job.article else None,
             job.error_message,
-            job.created_at.isoformat(),
-            job.updated_at.isoformat()
-        ))
-        
-        conn.commit()
-        conn.close()
+            _to_epoch_us(job.created_at),
+            _to_epoch_us(job.updated_at)
+        )
     
     def _row_to_job(self, row) -> GenerationJob:
         """Convert database row to GenerationJob"""
-        (job_id, status, topic, word_count, language, serp_json, 
-         article_json, error, created, updated) = row
+        (job_id, status, topic, word_count, language, serp_blob, 
+         article_blob, error, created, updated) = row
         
         request = ArticleRequest(
             topic=topic,
@@ -146,41 +300,45 @@ class JobManager:
             language=language
         )
         
-        serp_data = SERPData(**json.loads(serp_json)) if serp_json else None
-        article = GeneratedArticle(**json.loads(article_json)) if article_json else None
+        # Stored data is re-validated on purpose: pydantic-core validation is
+        # faster than model_construct, which builds nested models in Python
+        serp_data = SERPData(**serialization.unpack(serp_blob)) if serp_blob else None
+        article = GeneratedArticle(**serialization.unpack(article_blob)) if article_blob else None
         
         return GenerationJob(
-            job_id=job_id,
+            job_id=uuid.UUID(bytes=job_id).hex,
             status=JobStatus(status),
             request=request,
             serp_data=serp_data,
             article=article,
             error_message=error,
-            created_at=datetime.fromisoformat(created),
-            updated_at=datetime.fromisoformat(updated)
+            created_at=_from_epoch_us(created),
+            updated_at=_from_epoch_us(updated)
         )
     
+    def count_jobs(self) -> int:
+        """Number of stored jobs"""
+        with self._cursor() as cursor:
+            return cursor.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    
     def list_jobs(self, limit: int = 10) -> list:
         """List recent jobs"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT job_id, status, topic, created_at 
-            FROM jobs 
-            ORDER BY created_at DESC 
-            LIMIT ?
-        """, (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT job_id, status, topic, created_at 
+                FROM jobs 
+                ORDER BY created_at DESC 
+                LIMIT ?
+            """, (limit,))
+            
+            rows = cursor.fetchall()
         
         return [
             {
-                "job_id": row[0],
+                "job_id": uuid.UUID(bytes=row[0]).hex,
                 "status": row[1],
                 "topic": row[2],
-                "created_at": row[3]
+                "created_at": _from_epoch_us(row[3]).isoformat()
             }
             for row in rows
         ]
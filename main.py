@@ -2,10 +2,10 @@
 CLI interface for SEO article generation
 """
 import argparse
-import json
 import sys
 from models import ArticleRequest
 from seo_agent import SEOAgent
+import serialization
 
 
 def main():
@@ -19,6 +19,13 @@ def main():
     generate_parser.add_argument('--word-count', type=int, default=1500, help='Target word count')
     generate_parser.add_argument('--language', default='en', help='Language code')
     generate_parser.add_argument('--output', '-o', help='Output file for article JSON')
+    generate_parser.add_argument('--stream', action='store_true', help='Print the model output as it is generated')
+    
+    # Batch generate command
+    batch_parser = subparsers.add_parser('generate-batch', help='Generate articles for many topics via the batch API')
+    batch_parser.add_argument('--input', '-i', required=True, help='Text file with one topic per line')
+    batch_parser.add_argument('--word-count', type=int, default=1500, help='Target word count')
+    batch_parser.add_argument('--language', default='en', help='Language code')
     
     # Status command
     status_parser = subparsers.add_parser('status', help='Check job status')
@@ -50,7 +57,11 @@ def main():
         print(f"Target word count: {args.word_count}")
         print("-" * 60)
         
-        job = agent.generate_article(request)
+        if args.stream:
+            job = agent.generate_article(request, on_text=lambda text: print(text, end="", flush=True))
+            print()
+        else:
+            job = agent.generate_article(request)
         
         print(f"\n✅ Article generated successfully!")
         print(f"Job ID: {job.job_id}")
@@ -69,12 +80,37 @@ def main():
                 output_data = {
                     "job_id": job.job_id,
                     "topic": job.request.topic,
-                    "article": job.article.dict()
+                    "article": job.article.model_dump()
                 }
-                with open(args.output, 'w') as f:
-                    json.dump(output_data, f, indent=2, default=str)
+                with open(args.output, 'wb') as f:
+                    f.write(serialization.dumps_pretty(output_data))
                 print(f"\n💾 Article saved to: {args.output}")
     
+    elif args.command == 'generate-batch':
+        with open(args.input) as f:
+            topics = [line.strip() for line in f if line.strip()]
+        
+        requests = [
+            ArticleRequest(
+                topic=topic,
+                target_word_count=args.word_count,
+                language=args.language
+            )
+            for topic in topics
+        ]
+        
+        print(f"\n📦 Submitting batch of {len(requests)} articles")
+        print("(batch processing can take a while; results are saved as jobs)")
+        print("-" * 60)
+        
+        jobs = agent.generate_batch(requests)
+        
+        print("\n📋 Batch Results:")
+        print("-" * 80)
+        for job in jobs:
+            print(f"ID: {job.job_id[:8]}... | Status: {job.status.value:10} | Topic: {job.request.topic}")
+        print("-" * 80)
+    
     elif args.command == 'status':
         job = agent.get_job_status(args.job_id)
         print(f"\nJob ID: {job.job_id}")
@@ -1,7 +1,7 @@
 """
 Data models for SEO article generation system
 """
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, validator
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
@@ -71,6 +71,23 @@ class ArticleOutline(BaseModel):
     """Structured outline extracted from SERP analysis"""
     h1: str
     sections: List[dict] = Field(description="List of {h2: str, h3: List[str]}")
+    _sections_markdown: Optional[str] = PrivateAttr(default=None)
+    
+    @property
+    def sections_markdown(self) -> str:
+        """Sections as markdown headings, rendered on first use"""
+        if self._sections_markdown is None:
+            self._sections_markdown = "\n".join([
+                f"## {section['h2']}\n" + "\n".join([f"### {h3}" for h3 in section['h3']])
+                for section in self.sections
+            ])
+        return self._sections_markdown
+    
+    def __eq__(self, other) -> bool:
+        # The rendered markdown is a cache, not part of the outline's value
+        if isinstance(other, ArticleOutline):
+            return self.__dict__ == other.__dict__
+        return NotImplemented
 
 
 class GeneratedArticle(BaseModel):
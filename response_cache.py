@@ -0,0 +1,60 @@
+"""
+On-disk cache for LLM responses
+"""
+import os
+import time
+import hashlib
+import tempfile
+from typing import Optional
+import serialization
+
+
+class ResponseCache:
+    """
+    Stores parsed LLM responses as JSON files named by the SHA-256 of the
+    request parameters. Entries older than ttl seconds are treated as misses.
+    """
+    
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """Build a cache from LLM_CACHE_DIR / LLM_CACHE_TTL, or None when caching is off"""
+        cache_dir = os.environ.get("LLM_CACHE_DIR")
+        if not cache_dir:
+            return None
+        
+        ttl = os.environ.get("LLM_CACHE_TTL")
+        return cls(cache_dir, float(ttl) if ttl else None)
+    
+    def key(self, params: dict) -> str:
+        """Cache key for a set of request parameters"""
+        return hashlib.sha256(serialization.dumps_bytes(params)).hexdigest()
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached response, or None on a miss or expired entry"""
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'rb') as f:
+                return serialization.loads(f.read())
+        except (FileNotFoundError, serialization.JSONDecodeError):
+            return None
+    
+    def put(self, key: str, data: dict):
+        """Write a response atomically so readers never see a partial file"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(serialization.dumps_bytes(data))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
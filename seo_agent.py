@@ -1,8 +1,11 @@
 """
 Main SEO article generation agent
 """
+import asyncio
+import contextlib
 import logging
-from models import ArticleRequest, GenerationJob, JobStatus
+from typing import Callable, List, Optional, Tuple
+from models import ArticleOutline, ArticleRequest, GeneratedArticle, GenerationJob, JobStatus
 from serp_analyzer import SERPAnalyzer
 from article_generator import ArticleGenerator
 from job_manager import JobManager
@@ -10,6 +13,9 @@ from job_manager import JobManager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent LLM calls in generate_articles
+MAX_CONCURRENCY = 32
+
 
 class SEOAgent:
     """Main agent orchestrating the article generation process"""
@@ -19,29 +25,21 @@ class SEOAgent:
         self.article_generator = ArticleGenerator()
         self.job_manager = JobManager(db_path)
     
-    def generate_article(self, request: ArticleRequest) -> GenerationJob:
+    def generate_article(
+        self, 
+        request: ArticleRequest, 
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> GenerationJob:
         """
         Main entry point for article generation.
-        Returns a job that can be tracked.
+        Returns a job that can be tracked. If on_text is given, the
+        model's response is streamed to it as it is generated.
         """
         # Create job
-        job = self.job_manager.create_job(request)
-        logger.info(f"Created job {job.job_id} for topic: {request.topic}")
+        job = self._start_job(request)
         
         try:
-            # Step 1: Fetch and analyze SERP data
-            self.job_manager.update_job_status(job.job_id, JobStatus.RUNNING)
-            logger.info(f"Fetching SERP data for: {request.topic}")
-            
-            serp_data = self.serp_analyzer.get_serp_data(request.topic)
-            self.job_manager.save_serp_data(job.job_id, serp_data)
-            logger.info(f"SERP data fetched: {len(serp_data.results)} results")
-            
-            # Step 2: Extract themes and generate outline
-            logger.info("Analyzing SERP themes...")
-            themes = self.serp_analyzer.extract_themes(serp_data)
-            outline = self.serp_analyzer.generate_outline(serp_data, themes)
-            questions = self.serp_analyzer.extract_questions(serp_data)
+            outline, questions = self._prepare_job(job)
             
             # Step 3: Generate article
             logger.info("Generating article with AI...")
@@ -49,15 +47,45 @@ class SEOAgent:
                 topic=request.topic,
                 outline=outline,
                 target_word_count=request.target_word_count,
-                questions=questions
+                questions=questions,
+                on_text=on_text
             )
             
-            # Step 4: Save and complete
-            self.job_manager.save_article(job.job_id, article)
-            logger.info(f"Article generated successfully: {article.word_count} words")
+            return self._complete_job(job, article)
+            
+        except Exception as e:
+            logger.error(f"Error generating article: {str(e)}")
+            self.job_manager.update_job_status(
+                job.job_id, 
+                JobStatus.FAILED, 
+                error=str(e)
+            )
+            raise
+    
+    async def agenerate_article(
+        self, 
+        request: ArticleRequest, 
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> GenerationJob:
+        """
+        Async variant of generate_article. The optional semaphore caps
+        how many LLM calls are in flight across concurrent jobs.
+        """
+        job = self._start_job(request)
+        
+        try:
+            outline, questions = self._prepare_job(job)
+            
+            logger.info(f"Generating article with AI for: {request.topic}")
+            async with semaphore or contextlib.nullcontext():
+                article = await self.article_generator.agenerate_article(
+                    topic=request.topic,
+                    outline=outline,
+                    target_word_count=request.target_word_count,
+                    questions=questions
+                )
             
-            # Return updated job
-            return self.job_manager.get_job(job.job_id)
+            return self._complete_job(job, article)
             
         except Exception as e:
             logger.error(f"Error generating article: {str(e)}")
@@ -68,6 +96,97 @@ class SEOAgent:
             )
             raise
     
+    async def generate_articles(self, requests: List[ArticleRequest]) -> list:
+        """
+        Generate several articles concurrently, sharing one HTTP/2
+        connection pool. Results are in request order; a request that
+        failed yields its exception instead of a job.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        return await asyncio.gather(
+            *[self.agenerate_article(request, semaphore) for request in requests],
+            return_exceptions=True
+        )
+    
+    def generate_batch(self, requests: List[ArticleRequest]) -> List[GenerationJob]:
+        """
+        Generate articles for many topics through the Message Batches API.
+        Cheaper than generate_articles but not real-time: blocks until
+        the whole batch has been processed.
+        """
+        with self.job_manager.transaction():
+            jobs = [self._start_job(request) for request in requests]
+        
+        pending = []
+        specs = []
+        for job in jobs:
+            request = job.request
+            try:
+                outline, questions = self._prepare_job(job)
+            except Exception as e:
+                logger.error(f"Error preparing job {job.job_id}: {str(e)}")
+                self.job_manager.update_job_status(job.job_id, JobStatus.FAILED, error=str(e))
+                continue
+            
+            pending.append(job)
+            specs.append((request.topic, outline, request.target_word_count, questions))
+        
+        if specs:
+            logger.info(f"Submitting {len(specs)} articles to the batch API...")
+            try:
+                results = self.article_generator.submit_batch(specs)
+            except Exception as e:
+                logger.error(f"Error running batch: {str(e)}")
+                for job in pending:
+                    self.job_manager.update_job_status(job.job_id, JobStatus.FAILED, error=str(e))
+                raise
+            with self.job_manager.transaction():
+                for job, result in zip(pending, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error generating article for job {job.job_id}: {str(result)}")
+                        self.job_manager.update_job_status(job.job_id, JobStatus.FAILED, error=str(result))
+                    else:
+                        self._complete_job(job, result)
+        
+        return [self.job_manager.get_job(job.job_id) for job in jobs]
+    
+    def _start_job(self, request: ArticleRequest) -> GenerationJob:
+        """Create a job and mark it running, committing both writes at once"""
+        with self.job_manager.transaction():
+            job = self.job_manager.create_job(request)
+            self.job_manager.update_job_status(job.job_id, JobStatus.RUNNING)
+        
+        logger.info(f"Created job {job.job_id} for topic: {request.topic}")
+        return job
+    
+    def _prepare_job(self, job: GenerationJob) -> Tuple[ArticleOutline, List[str]]:
+        """Run the SERP steps for a job and return its outline and FAQ questions"""
+        topic = job.request.topic
+        
+        # Step 1: Fetch and analyze SERP data
+        logger.info(f"Fetching SERP data for: {topic}")
+        
+        serp_data = self.serp_analyzer.get_serp_data(topic)
+        self.job_manager.save_serp_data(job.job_id, serp_data)
+        logger.info(f"SERP data fetched: {len(serp_data.results)} results")
+        
+        # Step 2: Extract themes and generate outline
+        logger.info("Analyzing SERP themes...")
+        themes = self.serp_analyzer.extract_themes(serp_data)
+        outline = self.serp_analyzer.generate_outline(serp_data, themes)
+        questions = self.serp_analyzer.extract_questions(serp_data)
+        
+        return outline, questions
+    
+    def _complete_job(self, job: GenerationJob, article: GeneratedArticle) -> GenerationJob:
+        """Save the article, mark the job completed and return the updated job"""
+        # Step 4: Save and complete
+        self.job_manager.save_article(job.job_id, article)
+        logger.info(f"Article generated successfully: {article.word_count} words")
+        
+        # Return updated job
+        return self.job_manager.get_job(job.job_id)
+    
     def resume_job(self, job_id: str) -> GenerationJob:
         """
         Resume a failed or interrupted job.
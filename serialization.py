@@ -0,0 +1,85 @@
+"""
+JSON serialization helpers (uses orjson and zstandard when available)
+"""
+import json
+import threading
+from typing import Union
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one type covers both
+JSONDecodeError = json.JSONDecodeError
+
+# First byte of a packed blob: how the JSON payload after it is encoded
+_PLAIN = b'\x00'
+_ZSTD = b'\x01'
+ZSTD_LEVEL = 3
+
+# zstd contexts are expensive to build and not thread-safe; keep one per thread
+_zstd = threading.local()
+
+
+def dumps_bytes(obj) -> bytes:
+    """Serialize an object to compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def dumps_pretty(obj) -> bytes:
+    """Serialize an object to indented UTF-8 JSON for files meant to be read by people"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, default=str).encode()
+
+
+def loads(data):
+    """Parse a JSON document from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack(model: BaseModel) -> bytes:
+    """Encode a model as JSON behind a format byte, zstd-compressed when available"""
+    data = model.model_dump_json().encode()
+    if zstandard is not None:
+        return _ZSTD + _compressor().compress(data)
+    return _PLAIN + data
+
+
+def unpack(blob: Union[bytes, str]):
+    """Decode a blob written by pack, or a plain JSON string from older rows"""
+    if isinstance(blob, str):
+        return loads(blob)
+    
+    fmt, payload = blob[:1], blob[1:]
+    if fmt == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed job data")
+        payload = _decompressor().decompress(payload)
+    return loads(payload)
+
+
+def _compressor():
+    """This thread's zstd compressor"""
+    if not hasattr(_zstd, "compressor"):
+        _zstd.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _zstd.compressor
+
+
+def _decompressor():
+    """This thread's zstd decompressor"""
+    if not hasattr(_zstd, "decompressor"):
+        _zstd.decompressor = zstandard.ZstdDecompressor()
+    return _zstd.decompressor
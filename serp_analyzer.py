@@ -4,12 +4,49 @@ SERP data fetching and analysis
 from models import SERPResult, SERPData, ArticleOutline
 from typing import List, Dict
 import re
-from collections import Counter
+import hashlib
+import functools
+from collections import Counter, OrderedDict
+
+# Words of four or more letters considered for theme extraction
+_WORD_RE = re.compile(r'\b[a-zA-Z]{4,}\b')
+_STOP_WORDS = frozenset({
+    'this', 'that', 'with', 'from', 'have', 'they', 'will', 'your', 'about',
+    'their', 'which', 'these', 'best', 'guide'
+})
+
+# Theme extractions kept per SERPAnalyzer (least recently used dropped first)
+ANALYSIS_CACHE_SIZE = 128
+
+
+def _memoize_on_serp(method):
+    """
+    Cache a SERPAnalyzer method on the content of its serp_data. Only worth
+    it where the analysis costs more than hashing the SERP. Each caller
+    gets its own shallow copy of the cached result.
+    """
+    @functools.wraps(method)
+    def wrapper(self, serp_data: SERPData):
+        key = hashlib.blake2b(serp_data.model_dump_json().encode(), digest_size=16).digest()
+        
+        cache = self._analysis_cache
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = method(self, serp_data)
+            if len(cache) > ANALYSIS_CACHE_SIZE:
+                cache.popitem(last=False)
+        return cache[key].copy()
+    
+    return wrapper
 
 
 class SERPAnalyzer:
     """Analyzes search results to extract themes and structure"""
     
+    def __init__(self):
+        self._analysis_cache = OrderedDict()
+    
     def get_serp_data(self, query: str) -> SERPData:
         """
         Fetch SERP data. Using mock data for simplicity.
@@ -32,6 +69,7 @@ class SERPAnalyzer:
         ]
         return results
     
+    @_memoize_on_serp
     def extract_themes(self, serp_data: SERPData) -> Dict[str, int]:
         """Extract common themes and keywords from SERP results"""
         all_text = " ".join([
@@ -39,13 +77,9 @@ class SERPAnalyzer:
             for result in serp_data.results
         ])
         
-        # Remove common words and extract meaningful terms
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', all_text.lower())
-        stop_words = {'this', 'that', 'with', 'from', 'have', 'they', 'will', 'your', 'about', 'their', 'which', 'these', 'best', 'guide'}
-        meaningful_words = [w for w in words if w not in stop_words]
-        
-        # Count frequency
-        word_freq = Counter(meaningful_words)
+        # Remove common words and count frequency of meaningful terms
+        words = _WORD_RE.findall(all_text.lower())
+        word_freq = Counter(w for w in words if w not in _STOP_WORDS)
         return dict(word_freq.most_common(20))
     
     def generate_outline(self, serp_data: SERPData, themes: Dict[str, int]) -> ArticleOutline:
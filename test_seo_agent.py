@@ -2,104 +2,215 @@
 Tests for SEO article generation system
 """
 import pytest
+import anthropic
+import asyncio
 import os
-import tempfile
-from models import ArticleRequest, JobStatus
+import re
+import sqlite3
+import time
+import uuid
+from types import SimpleNamespace
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pydantic import ValidationError
+from models import ArticleOutline, ArticleRequest, JobStatus
+from article_generator import (
+    ARTICLE_MAX_TOKENS, RATE_LIMIT_RETRIES, TOKENS_PER_WORD, ArticleGenerator, RateLimitBackoff
+)
 from seo_agent import SEOAgent
-from serp_analyzer import SERPAnalyzer
 from job_manager import JobManager
+from response_cache import ResponseCache
+import serialization
+
+OUTLINE = ArticleOutline(h1="Main Heading", sections=[{"h2": "Section 1", "h3": ["Sub 1"]}])
+
+
+def _message(text):
+    """Stand-in for an API Message with one text block"""
+    return SimpleNamespace(
+        content=[SimpleNamespace(text=text)],
+        usage=SimpleNamespace(input_tokens=1, output_tokens=1)
+    )
+
+
+def _article_json(generator, topic):
+    """A valid article response body for topic"""
+    return serialization.dumps_bytes(
+        generator._create_fallback_article(topic, OUTLINE, 500)
+    ).decode()
+
+
+class _RateLimited(anthropic.RateLimitError):
+    """RateLimitError that can be raised without an HTTP response"""
+    
+    def __init__(self):
+        Exception.__init__(self, "rate limited")
+
+
+def _assert_serp_shape(serp_data, query):
+    assert serp_data.query == query
+    assert len(serp_data.results) == 10
+    assert all(r.rank > 0 for r in serp_data.results)
+
+
+def _assert_themes(themes):
+    assert isinstance(themes, dict)
+    assert len(themes) > 0
+
+
+def _assert_outline(outline):
+    assert outline.h1
+    assert len(outline.sections) > 0
+    assert all(set(s).issuperset({"h2", "h3"}) for s in outline.sections)
+
+
+def _assert_questions(questions):
+    assert len(questions) > 0
+    assert all("?" in q for q in questions)
 
 
 class TestSERPAnalyzer:
     """Test SERP analysis functionality"""
     
-    def test_get_serp_data(self):
-        analyzer = SERPAnalyzer()
-        serp_data = analyzer.get_serp_data("best productivity tools")
+    @pytest.mark.parametrize("query", [
+        "best productivity tools",
+        "remote work strategies",
+        "email marketing tips",
+        "content marketing",
+    ])
+    def test_pipeline(self, analyzer, query):
+        serp_data = analyzer.get_serp_data(query)
+        _assert_serp_shape(serp_data, query)
         
-        assert serp_data.query == "best productivity tools"
-        assert len(serp_data.results) == 10
-        assert all(r.rank > 0 for r in serp_data.results)
-    
-    def test_extract_themes(self):
-        analyzer = SERPAnalyzer()
-        serp_data = analyzer.get_serp_data("remote work strategies")
-        themes = analyzer.extract_themes(serp_data)
-        
-        assert isinstance(themes, dict)
-        assert len(themes) > 0
-    
-    def test_generate_outline(self):
-        analyzer = SERPAnalyzer()
-        serp_data = analyzer.get_serp_data("email marketing tips")
         themes = analyzer.extract_themes(serp_data)
-        outline = analyzer.generate_outline(serp_data, themes)
+        _assert_themes(themes)
         
-        assert outline.h1
-        assert len(outline.sections) > 0
-        assert all('h2' in s and 'h3' in s for s in outline.sections)
-    
-    def test_extract_questions(self):
-        analyzer = SERPAnalyzer()
-        serp_data = analyzer.get_serp_data("content marketing")
-        questions = analyzer.extract_questions(serp_data)
-        
-        assert len(questions) > 0
-        assert all('?' in q for q in questions)
+        _assert_outline(analyzer.generate_outline(serp_data, themes))
+        _assert_questions(analyzer.extract_questions(serp_data))
+
+
+def _legacy_db(rows):
+    """
+    In-memory database with the original jobs table: TEXT columns, dashed
+    UUIDs, ISO timestamps and plain JSON. Rows are (topic, created_at, serp_data).
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            target_word_count INTEGER,
+            language TEXT,
+            serp_data TEXT,
+            article_data TEXT,
+            error_message TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    job_ids = [str(uuid.uuid4()) for _ in rows]
+    conn.executemany(
+        "INSERT INTO jobs VALUES (?, 'pending', ?, 1500, 'en', ?, NULL, NULL, ?, ?)",
+        [
+            (job_id, topic, serp_data and serp_data.model_dump_json(), created, created)
+            for job_id, (topic, created, serp_data) in zip(job_ids, rows)
+        ]
+    )
+    conn.commit()
+    return conn, job_ids
 
 
 class TestJobManager:
     """Test job persistence"""
     
-    def test_create_and_retrieve_job(self):
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            db_path = tmp.name
+    def test_create_and_retrieve_job(self, manager):
+        request = ArticleRequest(topic="test topic", target_word_count=1000)
         
-        try:
-            manager = JobManager(db_path)
-            request = ArticleRequest(topic="test topic", target_word_count=1000)
-            
-            job = manager.create_job(request)
-            assert job.job_id
-            assert job.status == JobStatus.PENDING
-            
-            retrieved = manager.get_job(job.job_id)
-            assert retrieved.job_id == job.job_id
-            assert retrieved.request.topic == "test topic"
-        finally:
-            os.unlink(db_path)
+        job = manager.create_job(request)
+        assert job.job_id
+        assert job.status == JobStatus.PENDING
+        
+        retrieved = manager.get_job(job.job_id)
+        assert retrieved.job_id == job.job_id
+        assert retrieved.request.topic == "test topic"
     
-    def test_update_job_status(self):
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            db_path = tmp.name
+    def test_update_job_status(self, manager):
+        request = ArticleRequest(topic="test")
+        job = manager.create_job(request)
         
-        try:
-            manager = JobManager(db_path)
-            request = ArticleRequest(topic="test")
-            job = manager.create_job(request)
-            
-            manager.update_job_status(job.job_id, JobStatus.RUNNING)
-            updated = manager.get_job(job.job_id)
-            assert updated.status == JobStatus.RUNNING
-        finally:
-            os.unlink(db_path)
+        manager.update_job_status(job.job_id, JobStatus.RUNNING)
+        updated = manager.get_job(job.job_id)
+        assert updated.status == JobStatus.RUNNING
+    
+    def test_list_jobs(self, manager):
+        # Create multiple jobs
+        requests = [ArticleRequest(topic=f"topic {i}") for i in range(3)]
+        manager.create_jobs(requests)
+        
+        assert manager.count_jobs() == 3
+        assert len(manager.list_jobs(limit=2)) == 2
+    
+    def test_transaction_rolls_back_on_error(self, manager):
+        with pytest.raises(RuntimeError):
+            with manager.transaction():
+                manager.create_job(ArticleRequest(topic="lost"))
+                raise RuntimeError("boom")
+        
+        assert manager.count_jobs() == 0
+    
+    def test_nested_transaction_joins_outer(self, manager):
+        with pytest.raises(RuntimeError):
+            with manager.transaction():
+                manager.create_job(ArticleRequest(topic="outer"))
+                with manager.transaction():
+                    manager.create_job(ArticleRequest(topic="inner"))
+                # The inner block did not commit on its own
+                assert manager._conn.in_transaction
+                raise RuntimeError("boom")
+        
+        assert manager.count_jobs() == 0
+        
+        with manager.transaction():
+            with manager.transaction():
+                manager.create_job(ArticleRequest(topic="inner"))
+        assert manager.count_jobs() == 1
     
-    def test_list_jobs(self):
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            db_path = tmp.name
+    def test_upgrades_legacy_database(self, analyzer):
+        serp_data = analyzer.get_serp_data("legacy topic")
+        conn, (older_id, newer_id) = _legacy_db([
+            ("older", "2025-06-01T08:30:00.250000", serp_data),
+            ("newer", "2025-07-01T08:30:00", None)
+        ])
         
-        try:
-            manager = JobManager(db_path)
+        with closing(JobManager.from_connection(conn)) as manager:
+            # Dashed and plain hex IDs both find the migrated row
+            job = manager.get_job(older_id)
+            assert job.job_id == uuid.UUID(older_id).hex
+            assert manager.get_job(job.job_id) == job
+            assert job.created_at == datetime(2025, 6, 1, 8, 30, 0, 250000)
+            assert job.serp_data == serp_data
             
-            # Create multiple jobs
-            for i in range(3):
-                request = ArticleRequest(topic=f"topic {i}")
-                manager.create_job(request)
+            manager.update_job_status(newer_id, JobStatus.FAILED, "boom")
+            failed = manager.get_job(newer_id)
+            assert failed.status == JobStatus.FAILED
+            assert failed.error_message == "boom"
             
-            jobs = manager.list_jobs()
-            assert len(jobs) == 3
-        finally:
-            os.unlink(db_path)
+            manager.create_job(ArticleRequest(topic="new"))
+            assert [j["topic"] for j in manager.list_jobs()] == ["new", "newer", "older"]
+    
+    @pytest.mark.slow
+    def test_persists_to_disk(self, tmp_path):
+        db_path = str(tmp_path / "jobs.db")
+        
+        with closing(JobManager(db_path)) as manager:
+            job = manager.create_job(ArticleRequest(topic="test topic"))
+            manager.update_job_status(job.job_id, JobStatus.RUNNING)
+        
+        with closing(JobManager(db_path)) as reopened:
+            retrieved = reopened.get_job(job.job_id)
+            assert retrieved.status == JobStatus.RUNNING
+            assert retrieved.request.topic == "test topic"
 
 
 class TestSEOValidation:
@@ -116,7 +227,7 @@ class TestSEOValidation:
         assert len(metadata.title_tag) <= 60
         
         # Title too long should be truncated or raise error
-        with pytest.raises(Exception):
+        with pytest.raises(ValidationError, match="title_tag"):
             SEOMetadata(
                 title_tag="x" * 70,
                 meta_description="Test"
@@ -133,7 +244,7 @@ class TestSEOValidation:
         assert len(metadata.meta_description) <= 160
         
         # Description too long
-        with pytest.raises(Exception):
+        with pytest.raises(ValidationError, match="meta_description"):
             SEOMetadata(
                 title_tag="Test",
                 meta_description="x" * 170
@@ -154,36 +265,343 @@ class TestSEOValidation:
         assert outline.h1
         assert len(outline.sections) == 2
         assert all('h2' in s for s in outline.sections)
+    
+    def test_outline_markdown_is_rendered_lazily(self):
+        from models import ArticleOutline
+        
+        # Building does not require every section to be renderable
+        ArticleOutline(h1="Main Heading", sections=[{"h2": "Section 1"}])
+        
+        outline = ArticleOutline(h1="Main Heading", sections=[{"h2": "Section 1", "h3": ["Sub 1"]}])
+        fresh = ArticleOutline(h1="Main Heading", sections=[{"h2": "Section 1", "h3": ["Sub 1"]}])
+        assert outline.sections_markdown == "## Section 1\n### Sub 1"
+        assert outline == fresh
+
+
+class TestArticleGenerator:
+    """Test batched article generation against a stubbed API call"""
+    
+    @pytest.fixture
+    def generator(self, monkeypatch):
+        monkeypatch.delenv("LLM_CACHE_DIR", raising=False)
+        generator = ArticleGenerator()
+        generator.calls = []
+        
+        def fake_call(params):
+            prompt = params["messages"][0]["content"][1]["text"]
+            generator.calls.append(prompt)
+            if "ARTICLE id=" in prompt:
+                return generator.batch_response, None
+            topic = re.search(r'about "(.+?)"', prompt).group(1)
+            return generator._create_fallback_article(topic, OUTLINE, 500), None
+        
+        monkeypatch.setattr(generator, "_call", fake_call)
+        return generator
+    
+    def _spec(self, topic, target_word_count=500):
+        return (topic, OUTLINE, target_word_count, ["What is it?"])
+    
+    def _item(self, generator, index, topic):
+        return {"id": index, **generator._create_fallback_article(topic, OUTLINE, 500)}
+    
+    def test_batch_matches_results_by_id(self, generator):
+        topics = ["alpha", "beta", "gamma"]
+        items = [self._item(generator, i, t) for i, t in reversed(list(enumerate(topics)))]
+        # Ids echoed back as strings still match
+        items[0]["id"] = "2"
+        items.append({"id": "not an id", "title_tag": "x"})
+        generator.batch_response = {"results": items}
+        
+        articles = generator.generate_articles_batch([self._spec(t) for t in topics])
+        
+        assert len(generator.calls) == 1
+        assert [a.keyword_analysis.primary_keyword for a in articles] == topics
+    
+    def test_batch_falls_back_for_missing_or_malformed_items(self, generator):
+        topics = ["alpha", "beta", "gamma"]
+        generator.batch_response = {
+            "results": [self._item(generator, 0, "alpha"), {"id": 1, "title_tag": "x"}]
+        }
+        
+        articles = generator.generate_articles_batch([self._spec(t) for t in topics])
+        
+        # One batched call, then one call each for the malformed and missing items
+        assert len(generator.calls) == 3
+        assert [a.keyword_analysis.primary_keyword for a in articles] == topics
+    
+    def test_long_articles_generated_alone(self, generator):
+        long_count = ARTICLE_MAX_TOKENS // TOKENS_PER_WORD + 1
+        generator.batch_response = {
+            "results": [self._item(generator, 1, "beta"), self._item(generator, 2, "gamma")]
+        }
+        
+        articles = generator.generate_articles_batch([
+            self._spec("alpha", long_count), self._spec("beta"), self._spec("gamma")
+        ])
+        
+        assert len(generator.calls) == 2
+        assert "ARTICLE id=" not in generator.calls[0]
+        assert "ARTICLE id=0" not in generator.calls[1]
+        assert [a.keyword_analysis.primary_keyword for a in articles] == ["alpha", "beta", "gamma"]
+
+
+class TestResponseCache:
+    """Test the on-disk LLM response cache"""
+    
+    @pytest.fixture
+    def generator(self, monkeypatch, tmp_path):
+        """Generator caching under tmp_path, with a stub client that counts calls"""
+        monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+        generator = ArticleGenerator()
+        generator.calls = 0
+        generator.response_text = ""
+        
+        def create(**params):
+            generator.calls += 1
+            return _message(generator.response_text)
+        
+        generator.client = SimpleNamespace(messages=SimpleNamespace(create=create))
+        return generator
+    
+    def test_round_trip_non_ascii(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        cache.put("k", {"title": "Café guide ✓"})
+        assert cache.get("k") == {"title": "Café guide ✓"}
+    
+    def test_expired_entry_is_a_miss(self, tmp_path):
+        cache = ResponseCache(str(tmp_path), ttl=60)
+        cache.put("k", {"a": 1})
+        assert cache.get("k") == {"a": 1}
+        
+        stale = time.time() - 120
+        os.utime(cache._path("k"), (stale, stale))
+        assert cache.get("k") is None
+    
+    def test_hit_skips_api_call(self, generator):
+        generator.response_text = _article_json(generator, "alpha")
+        
+        first = generator.generate_article("alpha", OUTLINE, 500, ["What is it?"])
+        second = generator.generate_article("alpha", OUTLINE, 500, ["What is it?"])
+        
+        assert generator.calls == 1
+        assert second == first
+    
+    def test_unusable_response_is_not_cached(self, generator):
+        generator.response_text = '{"title_tag": "x"}'
+        
+        for _ in range(2):
+            with pytest.raises(KeyError):
+                generator.generate_article("alpha", OUTLINE, 500, ["What is it?"])
+        
+        assert generator.calls == 2
+
+
+class TestStreaming:
+    """Test streamed generation against a stubbed messages.stream"""
+    
+    @pytest.fixture
+    def generator(self, monkeypatch, tmp_path):
+        """Generator caching under tmp_path whose stream sends the body in three chunks"""
+        monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+        generator = ArticleGenerator()
+        generator.streams = 0
+        body = _article_json(generator, "alpha")
+        third = len(body) // 3
+        generator.chunks = [body[:third], body[third:2 * third], body[2 * third:]]
+        
+        @contextmanager
+        def stream(**params):
+            generator.streams += 1
+            yield SimpleNamespace(
+                text_stream=iter(generator.chunks),
+                get_final_message=lambda: _message(body)
+            )
+        
+        generator.client = SimpleNamespace(messages=SimpleNamespace(stream=stream))
+        return generator
+    
+    def test_on_text_receives_chunks(self, generator):
+        received = []
+        
+        article = generator.generate_article("alpha", OUTLINE, 500, ["What is it?"], on_text=received.append)
+        
+        assert received == generator.chunks
+        assert article.keyword_analysis.primary_keyword == "alpha"
+    
+    def test_generate_article_stream_returns_article(self, generator):
+        stream = generator.generate_article_stream("alpha", OUTLINE, 500, ["What is it?"])
+        received = []
+        with pytest.raises(StopIteration) as done:
+            while True:
+                received.append(next(stream))
+        
+        assert received == generator.chunks
+        assert done.value.value.keyword_analysis.primary_keyword == "alpha"
+    
+    def test_cache_hit_streams_nothing(self, generator):
+        first = generator.generate_article("alpha", OUTLINE, 500, ["What is it?"], on_text=lambda text: None)
+        received = []
+        
+        second = generator.generate_article("alpha", OUTLINE, 500, ["What is it?"], on_text=received.append)
+        
+        assert generator.streams == 1
+        assert received == []
+        assert second == first
+
+
+class TestBatchAPI:
+    """Test Message Batches submission against a stubbed batches client"""
+    
+    # How the stub answers each topic; anything else succeeds
+    OUTCOMES = {"gamma": "errored", "delta": "malformed", "epsilon": "missing"}
+    
+    @pytest.fixture
+    def generator(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+        generator = ArticleGenerator()
+        generator.submitted = []
+        
+        def create(requests):
+            generator.submitted = requests
+            return SimpleNamespace(id="batch_1", processing_status="ended")
+        
+        def results(batch_id):
+            for request in generator.submitted:
+                prompt = request["params"]["messages"][0]["content"][1]["text"]
+                topic = re.search(r'about "(.+?)"', prompt).group(1)
+                outcome = self.OUTCOMES.get(topic, "succeeded")
+                if outcome == "missing":
+                    continue
+                if outcome == "errored":
+                    result = SimpleNamespace(type="errored")
+                else:
+                    text = '{"title_tag": "x"}' if outcome == "malformed" else _article_json(generator, topic)
+                    result = SimpleNamespace(type="succeeded", message=_message(text))
+                yield SimpleNamespace(custom_id=request["custom_id"], result=result)
+        
+        batches = SimpleNamespace(create=create, results=results)
+        generator.client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+        return generator
+    
+    def _spec(self, topic):
+        return (topic, OUTLINE, 500, ["What is it?"])
+    
+    def _cache_key(self, generator, topic):
+        return generator.cache.key(generator._request_params(generator._create_article_prompt(*self._spec(topic))))
+    
+    def test_mixed_results(self, generator):
+        # alpha is already cached, so it is never submitted
+        generator.cache.put(self._cache_key(generator, "alpha"), generator._create_fallback_article("alpha", OUTLINE, 500))
+        topics = ["alpha", "beta", "gamma", "delta", "epsilon"]
+        
+        results = generator.submit_batch([self._spec(t) for t in topics], poll_interval=0)
+        
+        assert [r["custom_id"] for r in generator.submitted] == ["1", "2", "3", "4"]
+        assert [r.keyword_analysis.primary_keyword for r in results[:2]] == ["alpha", "beta"]
+        assert isinstance(results[2], RuntimeError) and "errored" in str(results[2])
+        assert isinstance(results[3], KeyError)
+        assert isinstance(results[4], RuntimeError) and "No result" in str(results[4])
+        assert generator.cache.get(self._cache_key(generator, "beta")) is not None
+        assert generator.cache.get(self._cache_key(generator, "delta")) is None
+    
+    def test_agent_keeps_successes_beside_malformed_entries(self, generator):
+        agent = SEOAgent(":memory:")
+        agent.article_generator = generator
+        
+        jobs = agent.generate_batch([ArticleRequest(topic="beta"), ArticleRequest(topic="delta")])
+        
+        assert [job.status for job in jobs] == [JobStatus.COMPLETED, JobStatus.FAILED]
+
+
+class TestAsyncGeneration:
+    """Test rate-limit backoff and concurrent generation against a stubbed async client"""
+    
+    @pytest.fixture
+    def generator(self, monkeypatch):
+        """Generator whose async client is rate limited for its first `limited` calls"""
+        monkeypatch.delenv("LLM_CACHE_DIR", raising=False)
+        generator = ArticleGenerator()
+        generator.backoff = RateLimitBackoff(initial=0.001, maximum=0.004, step=0.001)
+        generator.calls = 0
+        generator.limited = 0
+        generator.in_flight = generator.max_in_flight = 0
+        
+        async def create(**params):
+            generator.calls += 1
+            if generator.calls <= generator.limited:
+                raise _RateLimited()
+            
+            prompt = params["messages"][0]["content"][1]["text"]
+            topic = re.search(r'about "(.+?)"', prompt).group(1)
+            generator.in_flight += 1
+            generator.max_in_flight = max(generator.max_in_flight, generator.in_flight)
+            await asyncio.sleep(0)
+            generator.in_flight -= 1
+            if topic == "broken":
+                raise RuntimeError("boom")
+            return _message(_article_json(generator, topic))
+        
+        generator._async_client = SimpleNamespace(messages=SimpleNamespace(create=create))
+        return generator
+    
+    def test_retries_rate_limits_then_succeeds(self, generator):
+        generator.limited = 3
+        
+        article = asyncio.run(generator.agenerate_article("alpha", OUTLINE, 500, ["What is it?"]))
+        
+        assert generator.calls == 4
+        assert article.keyword_analysis.primary_keyword == "alpha"
+        # Doubled to the 0.004 cap over three 429s, then one step back down
+        assert generator.backoff.delay == pytest.approx(0.003)
+    
+    def test_raises_after_retry_limit(self, generator):
+        generator.limited = RATE_LIMIT_RETRIES + 10
+        
+        with pytest.raises(anthropic.RateLimitError):
+            asyncio.run(generator.agenerate_article("alpha", OUTLINE, 500, ["What is it?"]))
+        
+        assert generator.calls == RATE_LIMIT_RETRIES + 1
+        assert generator.backoff.delay == generator.backoff.maximum
+    
+    def test_generate_articles_returns_exceptions_in_order(self, generator, monkeypatch):
+        monkeypatch.setattr("seo_agent.MAX_CONCURRENCY", 2)
+        agent = SEOAgent(":memory:")
+        agent.article_generator = generator
+        topics = ["alpha", "broken", "gamma", "delta"]
+        
+        results = asyncio.run(agent.generate_articles([ArticleRequest(topic=t) for t in topics]))
+        
+        assert isinstance(results[1], RuntimeError)
+        assert [r.request.topic for r in results if not isinstance(r, Exception)] == ["alpha", "gamma", "delta"]
+        assert all(r.status == JobStatus.COMPLETED for r in results if not isinstance(r, Exception))
+        assert generator.max_in_flight == 2
+        statuses = {job["topic"]: job["status"] for job in agent.list_jobs()}
+        assert statuses["broken"] == JobStatus.FAILED.value
 
 
 class TestEndToEnd:
     """End-to-end integration tests"""
     
+    @pytest.mark.slow
     @pytest.mark.skipif(
         not os.environ.get("ANTHROPIC_API_KEY"),
         reason="Requires ANTHROPIC_API_KEY"
     )
-    def test_complete_article_generation(self):
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            db_path = tmp.name
-        
-        try:
-            agent = SEOAgent(db_path)
-            request = ArticleRequest(
-                topic="digital marketing strategies",
-                target_word_count=800
-            )
-            
-            job = agent.generate_article(request)
-            
-            assert job.status == JobStatus.COMPLETED
-            assert job.article is not None
-            assert job.article.word_count > 0
-            assert job.article.seo_metadata.title_tag
-            assert len(job.article.internal_links) >= 3
-            assert len(job.article.external_references) >= 2
-        finally:
-            os.unlink(db_path)
+    def test_complete_article_generation(self, seo_agent):
+        request = ArticleRequest(
+            topic="digital marketing strategies",
+            target_word_count=800
+        )
+        
+        job = seo_agent.generate_article(request)
+        
+        assert job.status == JobStatus.COMPLETED
+        article = job.article
+        assert article is not None
+        assert article.word_count > 0
+        assert article.seo_metadata.title_tag
+        assert len(article.internal_links) >= 3
+        assert len(article.external_references) >= 2
 
 
 if __name__ == "__main__":